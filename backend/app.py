@@ -5,13 +5,23 @@ import os
 from dotenv import load_dotenv
 
 from config import config
+from models import init_models
 from routes import register_routes
+from tasks import init_queue
+from utils.model_utils import start_cleanup_thread
 
 # Load environment variables
 load_dotenv()
 
-def create_app(config_name='default'):
-    """Application factory"""
+def create_app(config_name='default', load_models=True):
+    """
+    Application factory
+    
+    Args:
+        config_name: Key into config
+        load_models: Load models and start background threads; off for the
+            dev server's reloader watcher, which never serves requests
+    """
     app = Flask(__name__)
     
     # Load configuration
@@ -25,6 +35,19 @@ def create_app(config_name='default'):
         }
     })
     
+    if load_models:
+        # Load models once so every request shares the same weights
+        init_models(app)
+    init_queue(app)
+    
+    # Sweep old files in the background instead of on a request
+    if load_models and app.config['CLEANUP_MAX_AGE_HOURS'] > 0:
+        start_cleanup_thread(
+            app.config['UPLOAD_FOLDER'],
+            max_age_hours=app.config['CLEANUP_MAX_AGE_HOURS'],
+            interval_seconds=app.config['CLEANUP_INTERVAL_SECONDS']
+        )
+    
     # Register routes
     register_routes(app)
     
@@ -50,9 +73,19 @@ def create_app(config_name='default'):
 
 
 if __name__ == '__main__':
-    app = create_app(os.getenv('FLASK_ENV', 'development'))
+    config_name = os.getenv('FLASK_ENV', 'development')
     
-    print(f"""
+    # In debug mode the reloader re-runs this script in a child process that
+    # serves requests; the parent only watches files, so skip loading models
+    reloader_watcher = (config[config_name].DEBUG
+                        and os.environ.get('WERKZEUG_RUN_MAIN') != 'true')
+    app = create_app(config_name, load_models=not reloader_watcher)
+    
+    if not app.config['DEBUG']:
+        print("⚠️  The Flask dev server is for development only. "
+              "Run: gunicorn -c gunicorn_conf.py wsgi:app")
+    else:
+        print(f"""
     ╔══════════════════════════════════════════╗
     ║   AI Design Studio - Backend Server     ║
     ╚══════════════════════════════════════════╝
@@ -64,9 +97,9 @@ if __name__ == '__main__':
     
     Press CTRL+C to stop
     """)
-    
-    app.run(
-        host=app.config['HOST'],
-        port=app.config['PORT'],
-        debug=app.config['DEBUG']
-    )
+        
+        app.run(
+            host=app.config['HOST'],
+            port=app.config['PORT'],
+            debug=app.config['DEBUG']
+        )
\ No newline at end of file
@@ -20,9 +20,32 @@ class Config:
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
     ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg'}
     
+    # Scheduled cleanup of old uploads/outputs (0 disables it)
+    CLEANUP_MAX_AGE_HOURS = int(os.environ.get('CLEANUP_MAX_AGE_HOURS', 0))
+    CLEANUP_INTERVAL_SECONDS = int(os.environ.get('CLEANUP_INTERVAL_SECONDS', 3600))
+    
+    # File serving: hand file bodies to the front-end server instead of
+    # streaming them through Python (X-Sendfile for Apache/lighttpd,
+    # X-Accel-Redirect for nginx, e.g. '/internal_uploads/')
+    USE_X_SENDFILE = os.environ.get('USE_X_SENDFILE', 'False') == 'True'
+    X_ACCEL_REDIRECT_PREFIX = os.environ.get('X_ACCEL_REDIRECT_PREFIX')
+    
     # Model settings
     PRETRAINED_MODELS_PATH = BASE_DIR / 'pretrained_models'
     MODEL_DEVICE = 'mps'  # For Apple Silicon M4
+    # Compile the VGG feature extractor with torch.compile
+    COMPILE_MODELS = os.environ.get('COMPILE_MODELS', 'True') == 'True'
+    # Mixed-precision (float16) VGG forwards on GPU devices
+    USE_AMP = os.environ.get('USE_AMP', 'True') == 'True'
+    # Base URL for pretrained fast style networks ({style_id}.pth)
+    FAST_STYLE_MODEL_URL = os.environ.get('FAST_STYLE_MODEL_URL')
+    # Expected SHA256 of downloaded checkpoints, e.g. 'candy=<hex>,mosaic=<hex>'
+    FAST_STYLE_MODEL_SHA256 = dict(
+        item.strip().split('=', 1)
+        for item in os.environ.get('FAST_STYLE_MODEL_SHA256', '').split(',') if '=' in item
+    )
+    # Style Gram matrices kept on disk (~2.4 MB each); oldest are pruned
+    GRAM_CACHE_MAX_FILES = int(os.environ.get('GRAM_CACHE_MAX_FILES', 256))
     
     # Image processing settings
     IMAGE_SIZE = 512
@@ -30,6 +53,12 @@ class Config:
     CONTENT_WEIGHT = 1
     NUM_STEPS = 300
     
+    # Background job queue (style transfer runs in worker.py when set)
+    REDIS_URL = os.environ.get('REDIS_URL')
+    TRANSFER_QUEUE_NAME = 'style_transfer'
+    TRANSFER_JOB_TIMEOUT = 600
+    TRANSFER_RESULT_TTL = 24 * 3600
+    
     # CORS settings
     CORS_ORIGINS = ['http://localhost:3000', 'http://127.0.0.1:3000', 'http://localhost:5001']
     
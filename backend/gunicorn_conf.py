@@ -0,0 +1,31 @@
+"""
+Gunicorn configuration for AI Design Studio
+
+Usage:
+    gunicorn -c gunicorn_conf.py wsgi:app
+"""
+
+import os
+
+bind = f"{os.environ.get('HOST', '0.0.0.0')}:{os.environ.get('PORT', 5000)}"
+
+# Every worker builds its own copy of the models, so keep the count small.
+# Threaded workers keep gallery/image/JSON requests moving while another
+# thread runs a transfer (PyTorch releases the GIL and model_lock serializes
+# model access); gevent workers would run that compute on the event loop.
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+workers = int(os.environ.get('GUNICORN_WORKERS', 2))
+threads = int(os.environ.get('GUNICORN_THREADS', 8))
+worker_connections = 1000
+
+# Style transfer can run for minutes inside a request
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 600))
+keepalive = 5
+max_requests = 0
+
+# Off by default: building the models in the master initializes the GPU
+# (neither Metal nor CUDA survives a fork), and under gevent it would create
+# locks and import ssl before the worker monkey-patches. On CPU-only hosts
+# with gthread/sync workers, GUNICORN_PRELOAD=1 loads the models once and
+# workers share the mmap-loaded VGG weights copy-on-write.
+preload_app = os.environ.get('GUNICORN_PRELOAD', '0') == '1'
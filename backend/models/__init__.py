@@ -3,8 +3,53 @@ Models package for AI Design Studio
 Contains GAN and style transfer implementations
 """
 
-from .style_transfer import StyleTransferModel
+import threading
+import torch
+
+from .style_transfer import StyleTransferModel, FastStyleTransferModel
 from .model_loader import ModelLoader
 from .gan_inference import GANInference
 
-__all__ = ['StyleTransferModel', 'ModelLoader', 'GANInference']
\ No newline at end of file
+
+def init_models(app):
+    """Initialize ML models once per process and share them via app.extensions"""
+    print("🔧 Initializing models...")
+    
+    # Allow TF32 tensor-core matmuls/convs for the remaining float32 work
+    torch.set_float32_matmul_precision('high')
+    torch.backends.cuda.matmul.allow_tf32 = True
+    torch.backends.cudnn.allow_tf32 = True
+    
+    model_loader = ModelLoader(app.config['PRETRAINED_MODELS_PATH'])
+    fast_model = FastStyleTransferModel(
+        model_loader,
+        base_url=app.config['FAST_STYLE_MODEL_URL'],
+        checksums=app.config['FAST_STYLE_MODEL_SHA256'],
+        warmup_size=app.config['IMAGE_SIZE'],
+        compile_model=app.config['COMPILE_MODELS'],
+        use_amp=app.config['USE_AMP']
+    )
+    # Only preset ids are ever requested; other .pth files are ignored
+    from routes.transfer import STYLE_PRESET_IDS
+    fast_model.preload(STYLE_PRESET_IDS)
+    
+    app.extensions['model_loader'] = model_loader
+    app.extensions['style_model'] = StyleTransferModel(
+        model_loader,
+        image_size=app.config['IMAGE_SIZE'],
+        fast_model=fast_model,
+        compile_model=app.config['COMPILE_MODELS'],
+        use_amp=app.config['USE_AMP'],
+        gram_cache_dir=app.config['PRETRAINED_MODELS_PATH'] / 'gram_cache',
+        gram_cache_max_files=app.config['GRAM_CACHE_MAX_FILES']
+    )
+    app.extensions['gan_inference'] = GANInference(model_loader.device)
+    
+    # Models keep per-call state (feature hooks, caches), so serialize access
+    app.extensions['model_lock'] = threading.Lock()
+    
+    print("✅ Models initialized successfully")
+
+
+__all__ = ['StyleTransferModel', 'FastStyleTransferModel', 'ModelLoader', 'GANInference',
+           'init_models']
\ No newline at end of file
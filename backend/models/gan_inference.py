@@ -9,18 +9,10 @@ class GANInference:
     
     def __init__(self, device):
         self.device = device
-    
-    def generate_variations(self, image_path, num_variations=4):
-        """
-        Generate variations of an image
-        (Simplified version - can be expanded with actual GAN)
-        """
-        image = Image.open(image_path).convert('RGB')
-        variations = []
         
-        # For now, create variations using transformations
+        # For now, create variations using transformations (built once)
         # In future, replace with actual GAN-based generation
-        transforms_list = [
+        self.variation_transforms = [
             transforms.Compose([
                 transforms.ColorJitter(brightness=0.2, contrast=0.2, saturation=0.2, hue=0.1),
                 transforms.RandomAffine(degrees=5, translate=(0.05, 0.05))
@@ -37,12 +29,16 @@ class GANInference:
                 transforms.ColorJitter(brightness=0.15, contrast=0.25, saturation=0.25),
             ])
         ]
+    
+    def generate_variations(self, image_path, num_variations=4):
+        """
+        Generate variations of an image
+        (Simplified version - can be expanded with actual GAN)
+        """
+        image = Image.open(image_path).convert('RGB')
         
-        for i in range(min(num_variations, len(transforms_list))):
-            transformed = transforms_list[i](image)
-            variations.append(transformed)
-        
-        return variations
+        num_variations = min(num_variations, len(self.variation_transforms))
+        return [transform(image) for transform in self.variation_transforms[:num_variations]]
     
     def blend_styles(self, style_paths, weights=None):
         """
@@ -58,22 +54,18 @@ class GANInference:
         assert len(style_paths) == len(weights), "Weights must match number of styles"
         assert abs(sum(weights) - 1.0) < 0.01, "Weights must sum to 1"
         
-        # Load and blend images
-        blended = None
+        # Load and blend images into a single preallocated buffer
+        images = [Image.open(path).convert('RGB') for path in style_paths]
+        width, height = images[0].size
+        blended = np.zeros((height, width, 3), dtype=np.float32)
         
-        for path, weight in zip(style_paths, weights):
-            img = Image.open(path).convert('RGB')
-            img_array = np.array(img).astype(np.float32)
+        for img, weight in zip(images, weights):
+            # Resize if needed
+            if img.size != (width, height):
+                img = img.resize((width, height), Image.Resampling.BILINEAR)
             
-            if blended is None:
-                blended = img_array * weight
-            else:
-                # Resize if needed
-                if blended.shape != img_array.shape:
-                    img = img.resize((blended.shape[1], blended.shape[0]))
-                    img_array = np.array(img).astype(np.float32)
-                
-                blended += img_array * weight
+            img_array = np.asarray(img, dtype=np.float32)
+            blended += img_array * weight
         
-        blended = np.clip(blended, 0, 255).astype(np.uint8)
-        return Image.fromarray(blended)
\ No newline at end of file
+        np.clip(blended, 0, 255, out=blended)
+        return Image.fromarray(blended.astype(np.uint8))
\ No newline at end of file
@@ -1,28 +1,71 @@
 import torch
 import torchvision.models as models
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import os
 import requests
 from tqdm import tqdm
 
+# Download chunk size (1MB)
+CHUNK_SIZE = 1 << 20
+
+
+class RangeNotSatisfied(IOError):
+    """Server answered a byte-range request with the full body"""
+
+
 class ModelLoader:
     """Handles loading and caching of pre-trained models"""
     
     def __init__(self, models_dir):
         self.models_dir = Path(models_dir)
         self.models_dir.mkdir(exist_ok=True)
-        self.device = torch.device("mps" if torch.backends.mps.is_available() else "cpu")
+        if torch.cuda.is_available():
+            self.device = torch.device("cuda")
+        elif torch.backends.mps.is_available():
+            self.device = torch.device("mps")
+        else:
+            self.device = torch.device("cpu")
         print(f"🎯 Using device: {self.device}")
     
-    def load_vgg19(self):
-        """Load VGG19 model for feature extraction"""
-        print("📦 Loading VGG19 model...")
+    def _load_vgg_features(self, name, builder):
+        """
+        Load the convolutional part of a VGG model
         
-        vgg = models.vgg19(pretrained=True).features.to(self.device).eval()
+        The first run fetches the torchvision weights and caches the feature
+        layers' state dict under models_dir. Later runs build the model on
+        the meta device and memory-map the cached weights straight in.
+        """
+        cache_path = self.models_dir / f"{name}_features.pt"
+        
+        if not cache_path.exists():
+            features = builder(pretrained=True).features
+            # Write then rename, so an interrupted or concurrent first run
+            # never leaves a truncated cache for later starts to mmap
+            tmp_path = cache_path.with_name(f"{cache_path.name}.{os.getpid()}.tmp")
+            torch.save(features.state_dict(), tmp_path)
+            os.replace(tmp_path, cache_path)
+        else:
+            with torch.device('meta'):
+                features = builder().features
+            state_dict = torch.load(cache_path, mmap=True, weights_only=True)
+            features.load_state_dict(state_dict, assign=True)
+        
+        vgg = features.to(self.device).eval()
         
         # Freeze all parameters
         for param in vgg.parameters():
             param.requires_grad_(False)
         
+        return vgg
+    
+    def load_vgg19(self):
+        """Load VGG19 model for feature extraction"""
+        print("📦 Loading VGG19 model...")
+        
+        vgg = self._load_vgg_features('vgg19', models.vgg19)
+        
         print("✅ VGG19 loaded successfully")
         return vgg
     
@@ -30,40 +73,128 @@ class ModelLoader:
         """Load VGG16 model (alternative for style transfer)"""
         print("📦 Loading VGG16 model...")
         
-        vgg = models.vgg16(pretrained=True).features.to(self.device).eval()
-        
-        for param in vgg.parameters():
-            param.requires_grad_(False)
+        vgg = self._load_vgg_features('vgg16', models.vgg16)
         
         print("✅ VGG16 loaded successfully")
         return vgg
     
-    def download_style_model(self, url, filename):
-        """Download a pre-trained style model"""
+    def download_style_model(self, url, filename, sha256=None, num_workers=4):
+        """
+        Download a pre-trained style model
+        
+        Uses parallel HTTP range requests when the server supports them and
+        falls back to a single streamed request otherwise. The file's SHA256
+        is stored next to it; existing files are checked against sha256 (or
+        that stored digest) and downloaded again on a mismatch.
+        
+        Args:
+            url: Model URL
+            filename: Name to save the model under
+            sha256: Optional expected SHA256 hex digest
+            num_workers: Number of parallel range requests
+        """
         filepath = self.models_dir / filename
+        digest_path = filepath.with_name(filename + '.sha256')
         
         if filepath.exists():
-            print(f"✅ Model already exists: {filename}")
-            return filepath
+            expected = sha256 or (digest_path.read_text().strip()
+                                  if digest_path.exists() else None)
+            if expected is None or self._file_sha256(filepath) == expected.lower():
+                print(f"✅ Model already exists: {filename}")
+                return filepath
+            print(f"⚠️  Checksum mismatch for {filename}, downloading again")
         
         print(f"⬇️  Downloading {filename}...")
         
-        response = requests.get(url, stream=True)
-        total_size = int(response.headers.get('content-length', 0))
+        # Per-process name: web and queue workers may fetch the same file at once
+        tmp_path = filepath.with_name(f"{filename}.{os.getpid()}.part")
         
-        with open(filepath, 'wb') as f, tqdm(
-            total=total_size,
-            unit='B',
-            unit_scale=True,
-            desc=filename
-        ) as pbar:
-            for chunk in response.iter_content(chunk_size=8192):
-                f.write(chunk)
-                pbar.update(len(chunk))
+        try:
+            head = requests.head(url, allow_redirects=True, timeout=30)
+            head.raise_for_status()
+            total_size = int(head.headers.get('content-length', 0))
+            supports_ranges = head.headers.get('accept-ranges', '').lower() == 'bytes'
+            range_url = head.url
+        except requests.RequestException as e:
+            print(f"⚠️  HEAD request failed ({e}), using a single download")
+            total_size, supports_ranges, range_url = 0, False, url
+        
+        try:
+            with tqdm(total=total_size, unit='B', unit_scale=True, desc=filename) as pbar:
+                if supports_ranges and total_size >= num_workers * CHUNK_SIZE:
+                    try:
+                        self._download_ranges(range_url, tmp_path, total_size, num_workers, pbar)
+                    except RangeNotSatisfied as e:
+                        print(f"⚠️  {e}, using a single download")
+                        pbar.reset()
+                        self._download_stream(url, tmp_path, pbar)
+                else:
+                    self._download_stream(url, tmp_path, pbar)
+            
+            digest = self._file_sha256(tmp_path)
+            if sha256 is not None and digest != sha256.lower():
+                raise ValueError(
+                    f"Checksum mismatch for {filename}: expected {sha256}, got {digest}"
+                )
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            raise
+        
+        tmp_path.replace(filepath)
+        digest_path.write_text(digest)
         
         print(f"✅ Downloaded: {filename}")
         return filepath
     
+    def _download_stream(self, url, path, pbar):
+        """Download a file with a single streamed request"""
+        with requests.get(url, stream=True, timeout=30) as response:
+            response.raise_for_status()
+            
+            with open(path, 'wb') as f:
+                for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                    f.write(chunk)
+                    pbar.update(len(chunk))
+    
+    def _download_ranges(self, url, path, total_size, num_workers, pbar):
+        """Download a file as parallel byte ranges written in place"""
+        part_size = -(-total_size // num_workers)
+        ranges = [(start, min(start + part_size, total_size) - 1)
+                  for start in range(0, total_size, part_size)]
+        
+        def fetch(byte_range):
+            start, end = byte_range
+            with requests.get(url, headers={'Range': f'bytes={start}-{end}'},
+                              stream=True, timeout=30) as response:
+                response.raise_for_status()
+                if response.status_code != 206:
+                    raise RangeNotSatisfied(
+                        f"Server ignored range request for bytes {start}-{end}"
+                    )
+                
+                offset = start
+                for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                    os.pwrite(fd, chunk, offset)
+                    offset += len(chunk)
+                    pbar.update(len(chunk))
+        
+        fd = os.open(path, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            os.ftruncate(fd, total_size)
+            with ThreadPoolExecutor(max_workers=num_workers) as executor:
+                list(executor.map(fetch, ranges))
+        finally:
+            os.close(fd)
+    
+    @staticmethod
+    def _file_sha256(path):
+        """Compute a file's SHA256 hex digest"""
+        sha = hashlib.sha256()
+        with open(path, 'rb') as f:
+            while chunk := f.read(CHUNK_SIZE):
+                sha.update(chunk)
+        return sha.hexdigest()
+    
     def get_style_layers(self, model_type='vgg19'):
         """Get the layers to use for style and content"""
         if model_type == 'vgg19':
@@ -3,20 +3,241 @@ import torch.nn as nn
 import torch.optim as optim
 from torchvision import transforms
 from PIL import Image
+from collections import OrderedDict
+from contextlib import nullcontext
+from pathlib import Path
 import copy
+import hashlib
+import os
+import re
+
+from .fast_transformer import load_transformer_net
+
+# Style ids become checkpoint filenames and download URLs
+STYLE_ID_PATTERN = re.compile(r'[A-Za-z0-9_-]+')
+
+# torch.autocast only accepts device_type='mps' from PyTorch 2.5 onwards
+AMP_DEVICE_TYPES = ('cuda', 'mps') if torch.__version__ >= '2.5' else ('cuda',)
+
+
+def amp_autocast(device, enabled):
+    """float16 autocast on the device, or a no-op context when AMP is off"""
+    if not enabled:
+        return nullcontext()
+    return torch.autocast(device_type=device.type, dtype=torch.float16)
+
+
+class Normalization(nn.Module):
+    """Normalize an image tensor with ImageNet statistics for VGG"""
+    
+    def __init__(self, mean, std):
+        super().__init__()
+        self.register_buffer('mean', mean.view(-1, 1, 1))
+        self.register_buffer('std', std.view(-1, 1, 1))
+    
+    def forward(self, image):
+        return (image - self.mean) / self.std
+
+
+class FastStyleTransferModel:
+    """Feed-forward style transfer using pretrained per-style networks"""
+    
+    def __init__(self, model_loader, base_url=None, compile_model=False, use_amp=True,
+                 checksums=None, warmup_size=None):
+        self.device = model_loader.device
+        self.model_loader = model_loader
+        self.base_url = base_url
+        # Expected SHA256 per style id for downloaded checkpoints
+        self.checksums = checksums or {}
+        self.compile_model = compile_model and hasattr(torch, 'compile')
+        self.warmup_size = warmup_size
+        
+        # float16 autocast on GPU devices, channels-last convs on CUDA
+        self.use_amp = use_amp and self.device.type in AMP_DEVICE_TYPES
+        self.memory_format = (torch.channels_last if self.device.type == 'cuda'
+                              else torch.contiguous_format)
+        
+        # Loaded networks, one per style id (eager and, if enabled, compiled)
+        self._nets = {}
+        self._compiled_nets = {}
+    
+    def checkpoint_name(self, style_id):
+        """Get the checkpoint filename for a style"""
+        return f"{style_id}.pth"
+    
+    def has_style(self, style_id):
+        """Check whether a pretrained network is available for a style"""
+        if style_id in self._nets:
+            return True
+        if not STYLE_ID_PATTERN.fullmatch(style_id):
+            return False
+        
+        filepath = self.model_loader.models_dir / self.checkpoint_name(style_id)
+        return filepath.exists() or self.base_url is not None
+    
+    def preload(self, style_ids):
+        """
+        Load, and warm up, the networks for these styles that are on disk
+        
+        A checkpoint that fails to load is logged and skipped so it can't
+        stop the server from starting.
+        """
+        for style_id in sorted(style_ids):
+            filepath = self.model_loader.models_dir / self.checkpoint_name(style_id)
+            if not filepath.exists():
+                continue
+            
+            try:
+                self.get_net(style_id)
+                self._warmup(style_id)
+            except Exception as e:
+                print(f"⚠️  Skipping fast style model {style_id}: {e}")
+                self._nets.pop(style_id, None)
+                self._compiled_nets.pop(style_id, None)
+    
+    def _warmup(self, style_id):
+        """Compile a style network before the first request needs it"""
+        if style_id not in self._compiled_nets or not self.warmup_size:
+            return
+        
+        # Compiled with dynamic shapes, so one landscape-sized pass covers
+        # the aspect ratios load_image produces
+        dummy = torch.zeros(1, 3, self.warmup_size * 3 // 4, self.warmup_size,
+                            device=self.device)
+        dummy = dummy.contiguous(memory_format=self.memory_format)
+        with torch.inference_mode(), amp_autocast(self.device, self.use_amp):
+            self._forward(style_id, dummy)
+    
+    def get_net(self, style_id):
+        """Load (or reuse) the network for a style"""
+        if style_id not in self._nets:
+            if not STYLE_ID_PATTERN.fullmatch(style_id):
+                raise ValueError(f"Invalid style id: {style_id!r}")
+            
+            filename = self.checkpoint_name(style_id)
+            filepath = self.model_loader.models_dir / filename
+            
+            if self.base_url is not None:
+                # Also verifies an existing file, downloading it again on a mismatch
+                filepath = self.model_loader.download_style_model(
+                    f"{self.base_url.rstrip('/')}/{filename}", filename,
+                    sha256=self.checksums.get(style_id)
+                )
+            elif not filepath.exists():
+                raise FileNotFoundError(f"No pretrained model for style: {style_id}")
+            
+            print(f"📦 Loading fast style model: {style_id}")
+            self._nets[style_id] = load_transformer_net(filepath, self.device).to(
+                memory_format=self.memory_format
+            )
+            
+            if self.compile_model:
+                # reduce-overhead captures CUDA graphs, removing per-kernel
+                # launch cost on repeat calls with the same input shape.
+                # Inputs keep their aspect ratio, so compile for dynamic
+                # shapes rather than recompiling for every new size.
+                self._compiled_nets[style_id] = torch.compile(
+                    self._nets[style_id], mode='reduce-overhead', dynamic=True
+                )
+        
+        return self._nets[style_id]
+    
+    def _forward(self, style_id, image):
+        """Run a style network, preferring the compiled version"""
+        compiled = self._compiled_nets.get(style_id)
+        if compiled is not None:
+            try:
+                # Graph-captured outputs are reused by the next call
+                return compiled(image).clone()
+            except Exception as e:
+                print(f"⚠️  Compiled style model failed, using eager mode: {e}")
+                del self._compiled_nets[style_id]
+        
+        return self._nets[style_id](image)
+    
+    def stylize(self, content_img, style_id):
+        """
+        Stylize an image tensor in a single forward pass
+        
+        Args:
+            content_img: Tensor in [0, 1] range, shape (1, 3, H, W)
+            style_id: Style preset id
+        
+        Returns:
+            Stylized tensor in [0, 1] range
+        """
+        self.get_net(style_id)
+        
+        image = (content_img * 255).contiguous(memory_format=self.memory_format)
+        
+        with torch.inference_mode(), amp_autocast(self.device, self.use_amp):
+            output = self._forward(style_id, image)
+        
+        # Downsample/upsample rounding can add a few pixels; crop to input size
+        height, width = content_img.shape[-2:]
+        output = output[..., :height, :width]
+        
+        return (output.float().clamp(0, 255) / 255).contiguous()
+
 
 class StyleTransferModel:
     """Neural Style Transfer using VGG19"""
     
-    def __init__(self, model_loader, image_size=512):
+    def __init__(self, model_loader, image_size=512, style_cache_size=32,
+                 fast_model=None, compile_model=True, use_amp=True, gram_cache_dir=None,
+                 gram_cache_max_files=256):
         self.device = model_loader.device
-        self.vgg = model_loader.load_vgg19()
+        self.fast_model = fast_model
         self.image_size = image_size
         self.style_layers, self.content_layers = model_loader.get_style_layers()
         
         # Normalization for VGG
         self.normalization_mean = torch.tensor([0.485, 0.456, 0.406]).to(self.device)
         self.normalization_std = torch.tensor([0.229, 0.224, 0.225]).to(self.device)
+        
+        # Fuse normalization in as the first layer; VGG layers keep their
+        # original names so the style/content layer indices still apply.
+        # Layers past the deepest referenced one are never needed, so drop them,
+        # but keep the ReLU right after it: torchvision's in-place ReLUs
+        # rewrite each hooked conv output, so every feature is post-activation.
+        vgg = model_loader.load_vgg19()
+        max_idx = max(int(name) for name in {**self.style_layers, **self.content_layers})
+        self.vgg = nn.Sequential(OrderedDict([
+            ('normalization', Normalization(self.normalization_mean, self.normalization_std)),
+            *((name, layer) for name, layer in vgg.named_children() if int(name) <= max_idx + 1)
+        ])).to(self.device).eval()
+        
+        # Channels-last lets CUDA convs use tensor-core kernels
+        self.memory_format = (torch.channels_last if self.device.type == 'cuda'
+                              else torch.contiguous_format)
+        self.vgg = self.vgg.to(memory_format=self.memory_format)
+        
+        # Capture style/content activations with hooks registered once,
+        # so extraction is a single call into the model
+        self._feat_buf = {}
+        for name, layer in self.vgg.named_children():
+            if name in self.style_layers or name in self.content_layers:
+                layer.register_forward_hook(
+                    lambda module, inputs, output, key=name: self._feat_buf.__setitem__(key, output)
+                )
+        
+        # Graph-compiled feature extraction (falls back to eager on failure)
+        self._compiled_features = None
+        if compile_model and hasattr(torch, 'compile'):
+            self._compiled_features = torch.compile(self._extract_features)
+        
+        # Run VGG forwards in float16 on GPU devices
+        self.use_amp = use_amp and self.device.type in AMP_DEVICE_TYPES
+        
+        # LRU cache of style Gram matrices, keyed by (path, mtime, image_size)
+        self.style_cache_size = style_cache_size
+        self._style_gram_cache = OrderedDict()
+        
+        # Gram matrices are also persisted here so restarts start warm
+        self.gram_cache_dir = Path(gram_cache_dir) if gram_cache_dir else None
+        self.gram_cache_max_files = gram_cache_max_files
+        if self.gram_cache_dir:
+            self.gram_cache_dir.mkdir(parents=True, exist_ok=True)
     
     def load_image(self, image_path):
         """Load and preprocess image"""
@@ -35,34 +256,175 @@ class StyleTransferModel:
         ])
         
         image = transform(image).unsqueeze(0)
+        if self.device.type == 'cuda':
+            # Page-locked source lets the host-to-device copy run asynchronously
+            return image.pin_memory().to(self.device, non_blocking=True)
         return image.to(self.device)
     
     def save_image(self, tensor, output_path):
         """Save tensor as image"""
-        image = tensor.cpu().clone()
-        image = image.squeeze(0)
-        image = transforms.ToPILImage()(image)
+        # Scale and cast on device, then a single contiguous copy to host
+        array = (tensor.detach().squeeze(0).clamp(0, 1).mul(255).byte()
+                 .permute(1, 2, 0).contiguous().cpu().numpy())
+        image = Image.fromarray(array)
         image.save(output_path)
         return image
     
     def gram_matrix(self, input_tensor):
         """Calculate Gram Matrix for style representation"""
         batch_size, channels, height, width = input_tensor.size()
-        features = input_tensor.view(batch_size * channels, height * width)
-        gram = torch.mm(features, features.t())
-        return gram.div(batch_size * channels * height * width)
+        features = input_tensor.reshape(batch_size, channels, height * width)
+        gram = torch.bmm(features, features.transpose(1, 2))
+        return gram.div(channels * height * width)
     
-    def get_features(self, image, model):
+    def get_features(self, image):
         """Extract features from specific layers"""
-        features = {}
-        x = image
+        # Only the no-grad reference passes run in float16: the optimized
+        # image's gradients (~1e-6 at 512px) underflow float16 without loss
+        # scaling, so passes that will be backpropagated stay in float32
+        use_amp = self.use_amp and not torch.is_grad_enabled()
+        with amp_autocast(self.device, use_amp):
+            # Only the VGG input is converted; LBFGS needs input_img contiguous
+            features = self._run_feature_extractor(
+                image.contiguous(memory_format=self.memory_format)
+            )
         
-        for name, layer in model._modules.items():
-            x = layer(x)
-            if name in self.style_layers or name in self.content_layers:
-                features[name] = x
+        # Gram matrices and losses are computed in float32; float16 sums
+        # over H*W overflow at full image size
+        return {layer: feature.float() for layer, feature in features.items()}
+    
+    def _run_feature_extractor(self, image):
+        """Run the compiled feature extractor, or eager mode if unavailable"""
+        if self._compiled_features is not None:
+            try:
+                return self._compiled_features(image)
+            except Exception as e:
+                # torch.compile is lazy, so backend errors (e.g. on MPS)
+                # only surface on the first call
+                print(f"⚠️  Compiled VGG failed, using eager mode: {e}")
+                self._compiled_features = None
         
-        return features
+        return self._extract_features(image)
+    
+    def _extract_features(self, image):
+        """Run VGG once, returning the hooked style/content activations"""
+        self._feat_buf.clear()
+        self.vgg(image)
+        return dict(self._feat_buf)
+    
+    def _style_cache_key(self, style_path):
+        """Cache key for a style image's Gram matrices"""
+        return (str(style_path), os.path.getmtime(style_path), self.image_size)
+    
+    def _gram_cache_path(self, key):
+        """On-disk location of a style's cached Gram matrices"""
+        digest = hashlib.sha256(repr(key).encode()).hexdigest()
+        return self.gram_cache_dir / f"{digest}.pt"
+    
+    def _remember_style_grams(self, key, style_grams):
+        """Store Gram matrices in the in-memory LRU cache"""
+        self._style_gram_cache[key] = style_grams
+        if len(self._style_gram_cache) > self.style_cache_size:
+            self._style_gram_cache.popitem(last=False)
+    
+    def _lookup_style_grams(self, key):
+        """Find cached Gram matrices in memory, then on disk; None on a miss"""
+        if key in self._style_gram_cache:
+            self._style_gram_cache.move_to_end(key)
+            return self._style_gram_cache[key]
+        
+        if self.gram_cache_dir:
+            cache_path = self._gram_cache_path(key)
+            try:
+                style_grams = torch.load(cache_path, map_location=self.device,
+                                         weights_only=True)
+            except FileNotFoundError:
+                return None
+            except Exception as e:
+                print(f"⚠️  Ignoring unreadable Gram cache {cache_path.name}: {e}")
+                return None
+            
+            # Refresh mtime so pruning drops the least recently used files
+            try:
+                os.utime(cache_path)
+            except OSError:
+                pass
+            
+            self._remember_style_grams(key, style_grams)
+            return style_grams
+        
+        return None
+    
+    def _cache_style_grams(self, key, style_features):
+        """Compute Gram matrices from style features and cache them"""
+        style_grams = {layer: self.gram_matrix(style_features[layer]).detach()
+                       for layer in self.style_layers}
+        
+        self._remember_style_grams(key, style_grams)
+        if self.gram_cache_dir:
+            # Workers share the directory: write then rename so readers
+            # never see a partial file
+            cache_path = self._gram_cache_path(key)
+            tmp_path = cache_path.with_name(f"{cache_path.name}.{os.getpid()}.tmp")
+            torch.save({layer: gram.cpu() for layer, gram in style_grams.items()}, tmp_path)
+            os.replace(tmp_path, cache_path)
+            self._prune_gram_cache()
+        
+        return style_grams
+    
+    def _prune_gram_cache(self):
+        """Delete the least recently used Gram cache files beyond the limit"""
+        entries = []
+        with os.scandir(self.gram_cache_dir) as it:
+            for entry in it:
+                if entry.name.endswith('.pt'):
+                    try:
+                        entries.append((entry.stat().st_mtime, entry.path))
+                    except FileNotFoundError:
+                        continue
+        
+        if len(entries) <= self.gram_cache_max_files:
+            return
+        
+        entries.sort()
+        for _, path in entries[:len(entries) - self.gram_cache_max_files]:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+    
+    def _get_reference_features(self, content_img, style_path):
+        """
+        Get content features and style Gram matrices for a transfer
+        
+        On a style cache miss where both images share a shape, content and
+        style go through VGG together as one batch.
+        """
+        key = self._style_cache_key(style_path)
+        
+        with torch.no_grad():
+            content_features = None
+            style_grams = self._lookup_style_grams(key)
+            
+            if style_grams is None:
+                style_img = self.load_image(style_path)
+                
+                if style_img.shape == content_img.shape:
+                    refs = self.get_features(torch.cat([content_img, style_img], 0))
+                    content_features = {layer: feature[0:1].detach()
+                                        for layer, feature in refs.items()}
+                    style_grams = self._cache_style_grams(
+                        key, {layer: feature[1:2] for layer, feature in refs.items()}
+                    )
+                else:
+                    # Reuse the decoded style image rather than loading it again
+                    style_grams = self._cache_style_grams(key, self.get_features(style_img))
+            
+            if content_features is None:
+                content_features = {layer: feature.detach() for layer, feature
+                                    in self.get_features(content_img).items()}
+        
+        return content_features, style_grams
     
     def transfer_style(self, content_path, style_path, output_path, 
                        num_steps=300, style_weight=1000000, content_weight=1,
@@ -83,18 +445,12 @@ class StyleTransferModel:
         
         # Load images
         content_img = self.load_image(content_path)
-        style_img = self.load_image(style_path)
         
         # Start with content image (or use random noise)
         input_img = content_img.clone()
         
-        # Get features
-        content_features = self.get_features(content_img, self.vgg)
-        style_features = self.get_features(style_img, self.vgg)
-        
-        # Calculate style gram matrices
-        style_grams = {layer: self.gram_matrix(style_features[layer]) 
-                       for layer in self.style_layers}
+        # Reference features (style gram matrices are cached across requests)
+        content_features, style_grams = self._get_reference_features(content_img, style_path)
         
         # Optimizer
         optimizer = optim.LBFGS([input_img.requires_grad_()])
@@ -108,7 +464,7 @@ class StyleTransferModel:
             optimizer.zero_grad()
             
             # Get features of input image
-            input_features = self.get_features(input_img, self.vgg)
+            input_features = self.get_features(input_img)
             
             # Content loss
             content_loss = 0
@@ -157,13 +513,50 @@ class StyleTransferModel:
         
         return output_path
     
-    def quick_transfer(self, content_path, style_path, output_path, intensity=1.0):
+    def feed_forward(self, content_path, style_id, output_path, intensity=1.0):
+        """
+        Style transfer with a pretrained feed-forward network
+        
+        Args:
+            content_path: Path to content image
+            style_id: Style preset id
+            output_path: Path to save output
+            intensity: Style strength, blended against the content (0.0 to 1.0)
+        """
+        print(f"⚡ Running feed-forward style transfer ({style_id})...")
+        
+        content_img = self.load_image(content_path)
+        output = self.fast_model.stylize(content_img, style_id)
+        
+        if intensity < 1.0:
+            output = torch.lerp(content_img, output, max(intensity, 0.0))
+        
+        self.save_image(output, output_path)
+        
+        print(f"✅ Style transfer complete! Saved to {output_path}")
+        
+        return output_path
+    
+    def quick_transfer(self, content_path, style_path, output_path, intensity=1.0,
+                       style_id=None):
         """
-        Faster style transfer with fewer iterations
+        Faster style transfer
+        
+        Uses the feed-forward network when one is available for style_id,
+        otherwise falls back to optimization with fewer iterations.
         
         Args:
             intensity: Style strength (0.0 to 2.0)
+            style_id: Optional style preset id
         """
+        if style_id and self.fast_model and self.fast_model.has_style(style_id):
+            try:
+                self.fast_model.get_net(style_id)
+            except Exception as e:
+                print(f"⚠️  Feed-forward model for {style_id} unavailable, using optimization: {e}")
+            else:
+                return self.feed_forward(content_path, style_id, output_path, intensity)
+        
         num_steps = 150  # Fewer steps for speed
         style_weight = int(1000000 * intensity)
         
@@ -1,7 +1,9 @@
 from flask import Blueprint, request, jsonify, current_app
 from pathlib import Path
+import hashlib
 import json
-from datetime import datetime
+import os
+import time
 
 from utils.model_utils import create_response, cleanup_old_files
 from utils.image_processing import ImageProcessor
@@ -11,40 +13,105 @@ gallery_bp = Blueprint('gallery', __name__)
 # Simple in-memory gallery storage (in production, use a database)
 gallery_storage = []
 
+# Image metadata and formatted timestamps keyed by (filename, mtime_ns, size),
+# so unchanged files are only opened and formatted once
+_meta_cache = {}
+
 
 @gallery_bp.route('/gallery', methods=['GET'])
 def get_gallery():
-    """Get all saved images in gallery"""
+    """
+    Get saved images in gallery
+    
+    Query params:
+        limit: Maximum number of images to return (default: all)
+        offset: Number of images to skip (default: 0)
+    """
     try:
         # Get all images from uploads folder
         upload_folder = current_app.config['UPLOAD_FOLDER']
+        limit = request.args.get('limit', type=int)
+        if limit is not None:
+            limit = max(limit, 0)
+        offset = max(request.args.get('offset', 0, type=int), 0)
+        
+        entries = []
+        thumbnails = set()
+        with os.scandir(upload_folder) as it:
+            for entry in it:
+                if entry.name.startswith('thumb_') and entry.name.endswith('.webp'):
+                    thumbnails.add(entry.name)
+                    continue
+                
+                if not (entry.name.startswith('styled_') and entry.name.endswith('.png')):
+                    continue
+                
+                try:
+                    if entry.is_file():
+                        entries.append((entry.name, entry.stat()))
+                except OSError as e:
+                    print(f"Error processing {entry.name}: {e}")
+                    continue
+        
+        # The listing only changes when files are added, removed or rewritten
+        max_mtime = max((stat.st_mtime_ns for _, stat in entries), default=0)
+        total_size = sum(stat.st_size for _, stat in entries)
+        etag = hashlib.md5(
+            f"{len(entries)}-{len(thumbnails)}-{max_mtime}-{total_size}-{offset}-{limit}".encode()
+        ).hexdigest()
+        
+        if request.if_none_match.contains(etag):
+            response = current_app.response_class(status=304)
+            response.set_etag(etag)
+            return response
+        
+        # Sort by creation time (newest first)
+        entries.sort(key=lambda item: item[1].st_mtime_ns, reverse=True)
+        page = entries[offset:] if limit is None else entries[offset:offset + limit]
         
         images = []
-        for file_path in upload_folder.glob('styled_*.png'):
+        live_keys = {(name, stat.st_mtime_ns, stat.st_size) for name, stat in entries}
+        for name, stat in page:
+            key = (name, stat.st_mtime_ns, stat.st_size)
+            
+            thumbnail = ImageProcessor.thumbnail_path(name).name
+            
             try:
-                img_info = ImageProcessor.get_image_info(file_path)
+                if key not in _meta_cache:
+                    _meta_cache[key] = {
+                        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S',
+                                                    time.localtime(stat.st_mtime)),
+                        'info': ImageProcessor.get_image_info(upload_folder / name)
+                    }
+                meta = _meta_cache[key]
                 images.append({
-                    'filename': file_path.name,
-                    'created_at': datetime.fromtimestamp(
-                        file_path.stat().st_mtime
-                    ).isoformat(),
-                    'info': img_info
+                    'filename': name,
+                    'thumbnail': thumbnail if thumbnail in thumbnails else None,
+                    'created_at': meta['created_at'],
+                    'info': meta['info']
                 })
             except Exception as e:
-                print(f"Error processing {file_path.name}: {e}")
+                print(f"Error processing {name}: {e}")
                 continue
         
-        # Sort by creation time (newest first)
-        images.sort(key=lambda x: x['created_at'], reverse=True)
+        # Forget files that were deleted or rewritten; another request may
+        # be pruning the same keys concurrently
+        for key in _meta_cache.keys() - live_keys:
+            _meta_cache.pop(key, None)
         
-        return jsonify(create_response(
+        response = jsonify(create_response(
             success=True,
             message="Gallery retrieved successfully",
             data={
                 'images': images,
-                'count': len(images)
+                'count': len(images),
+                'total': len(entries),
+                'offset': offset,
+                'limit': limit
             }
-        )), 200
+        ))
+        response.set_etag(etag)
+        return response, 200
         
     except Exception as e:
         print(f"Error retrieving gallery: {str(e)}")
@@ -70,6 +137,9 @@ def delete_from_gallery(filename):
         
         filepath.unlink()
         
+        # Remove the gallery thumbnail along with the image
+        ImageProcessor.thumbnail_path(filepath).unlink(missing_ok=True)
+        
         return jsonify(create_response(
             success=True,
             message="Image deleted successfully",
@@ -118,18 +188,24 @@ def gallery_info():
     try:
         upload_folder = current_app.config['UPLOAD_FOLDER']
         
-        total_files = len(list(upload_folder.glob('*.png'))) + \
-                     len(list(upload_folder.glob('*.jpg'))) + \
-                     len(list(upload_folder.glob('*.jpeg')))
+        total_files = 0
+        styled_files = 0
+        total_size = 0
+        
+        # Single directory pass for counts and total size
+        with os.scandir(upload_folder) as entries:
+            for entry in entries:
+                if not entry.is_file() or entry.name == '.gitkeep':
+                    continue
+                
+                total_size += entry.stat().st_size
+                
+                extension = entry.name.rsplit('.', 1)[-1]
+                if extension in ('png', 'jpg', 'jpeg'):
+                    total_files += 1
+                    if extension == 'png' and entry.name.startswith('styled_'):
+                        styled_files += 1
         
-        styled_files = len(list(upload_folder.glob('styled_*.png')))
-        
-        # Calculate total size
-        total_size = sum(
-            f.stat().st_size 
-            for f in upload_folder.iterdir() 
-            if f.is_file() and f.name != '.gitkeep'
-        )
         total_size_mb = total_size / (1024 * 1024)
         
         return jsonify(create_response(
@@ -1,84 +1,85 @@
-from flask import Blueprint, request, jsonify, send_file, current_app
+from flask import Blueprint, request, send_from_directory, current_app
+from werkzeug.exceptions import RequestEntityTooLarge
 from werkzeug.utils import secure_filename
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+import mimetypes
 import traceback
 import time
 
-from models.style_transfer import StyleTransferModel
-from models.model_loader import ModelLoader
-from models.gan_inference import GANInference
+from tasks import run_transfer, enqueue_transfer, fetch_job
 from utils.image_processing import ImageProcessor
 from utils.model_utils import (
     allowed_file, 
     generate_filename, 
     create_response,
-    sanitize_filename,
-    validate_image_size
+    dumps_json,
+    json_response,
+    sanitize_filename
 )
 
 transfer_bp = Blueprint('transfer', __name__)
 
-# Initialize models (will be done once)
-model_loader = None
-style_transfer_model = None
-gan_inference = None
+# Available style presets
+STYLE_PRESETS = [
+    {
+        'id': 'starry_night',
+        'name': 'Starry Night',
+        'description': 'Van Gogh inspired swirling patterns',
+        'thumbnail': '/static/styles/starry_night.jpg'
+    },
+    {
+        'id': 'picasso',
+        'name': 'Cubist',
+        'description': 'Picasso-style geometric abstraction',
+        'thumbnail': '/static/styles/picasso.jpg'
+    },
+    {
+        'id': 'mosaic',
+        'name': 'Mosaic',
+        'description': 'Colorful mosaic tile patterns',
+        'thumbnail': '/static/styles/mosaic.jpg'
+    },
+    {
+        'id': 'wave',
+        'name': 'The Great Wave',
+        'description': 'Japanese woodblock print style',
+        'thumbnail': '/static/styles/wave.jpg'
+    },
+    {
+        'id': 'candy',
+        'name': 'Candy',
+        'description': 'Bright, colorful pop art style',
+        'thumbnail': '/static/styles/candy.jpg'
+    }
+]
 
-def init_models():
-    """Initialize ML models"""
-    global model_loader, style_transfer_model, gan_inference
-    
-    if model_loader is None:
-        print("🔧 Initializing models...")
-        model_loader = ModelLoader(current_app.config['PRETRAINED_MODELS_PATH'])
-        style_transfer_model = StyleTransferModel(
-            model_loader, 
-            image_size=current_app.config['IMAGE_SIZE']
-        )
-        gan_inference = GANInference(model_loader.device)
-        print("✅ Models initialized successfully")
+STYLE_PRESET_IDS = frozenset(preset['id'] for preset in STYLE_PRESETS)
+
+# The preset list never changes, so serialize its response once
+_STYLES_JSON = dumps_json(create_response(
+    success=True,
+    message="Styles retrieved successfully",
+    data={'styles': STYLE_PRESETS}
+))
 
 
 @transfer_bp.route('/styles', methods=['GET'])
 def get_styles():
     """Get available style presets"""
-    styles = [
-        {
-            'id': 'starry_night',
-            'name': 'Starry Night',
-            'description': 'Van Gogh inspired swirling patterns',
-            'thumbnail': '/static/styles/starry_night.jpg'
-        },
-        {
-            'id': 'picasso',
-            'name': 'Cubist',
-            'description': 'Picasso-style geometric abstraction',
-            'thumbnail': '/static/styles/picasso.jpg'
-        },
-        {
-            'id': 'mosaic',
-            'name': 'Mosaic',
-            'description': 'Colorful mosaic tile patterns',
-            'thumbnail': '/static/styles/mosaic.jpg'
-        },
-        {
-            'id': 'wave',
-            'name': 'The Great Wave',
-            'description': 'Japanese woodblock print style',
-            'thumbnail': '/static/styles/wave.jpg'
-        },
-        {
-            'id': 'candy',
-            'name': 'Candy',
-            'description': 'Bright, colorful pop art style',
-            'thumbnail': '/static/styles/candy.jpg'
-        }
-    ]
-    
-    return jsonify(create_response(
-        success=True,
-        message="Styles retrieved successfully",
-        data={'styles': styles}
-    ))
+    response = current_app.response_class(_STYLES_JSON, mimetype='application/json')
+    response.headers['Cache-Control'] = 'public, max-age=3600'
+    return response
+
+
+def _file_too_large():
+    """400 response for an upload over MAX_CONTENT_LENGTH"""
+    max_size = current_app.config['MAX_CONTENT_LENGTH']
+    return json_response(create_response(
+        success=False,
+        message=f"File too large. Maximum size is {max_size // (1024 * 1024)}MB",
+        error="file_too_large"
+    )), 400
 
 
 @transfer_bp.route('/upload', methods=['POST'])
@@ -86,7 +87,7 @@ def upload_image():
     """Upload an image for processing"""
     try:
         if 'file' not in request.files:
-            return jsonify(create_response(
+            return json_response(create_response(
                 success=False,
                 message="No file provided",
                 error="file_required"
@@ -95,14 +96,14 @@ def upload_image():
         file = request.files['file']
         
         if file.filename == '':
-            return jsonify(create_response(
+            return json_response(create_response(
                 success=False,
                 message="No file selected",
                 error="empty_filename"
             )), 400
         
         if not allowed_file(file.filename, current_app.config['ALLOWED_EXTENSIONS']):
-            return jsonify(create_response(
+            return json_response(create_response(
                 success=False,
                 message="File type not allowed. Please upload PNG, JPG, or JPEG",
                 error="invalid_file_type"
@@ -115,22 +116,14 @@ def upload_image():
         )
         
         filepath = current_app.config['UPLOAD_FOLDER'] / filename
-        file.save(filepath)
         
-        # Validate file size
-        is_valid, size_mb = validate_image_size(filepath)
-        if not is_valid:
-            filepath.unlink()  # Delete the file
-            return jsonify(create_response(
-                success=False,
-                message=f"File too large ({size_mb:.1f}MB). Maximum size is 16MB",
-                error="file_too_large"
-            )), 400
+        # Werkzeug has already enforced MAX_CONTENT_LENGTH while parsing the form
+        file.save(filepath)
         
         # Get image info
         img_info = ImageProcessor.get_image_info(filepath)
         
-        return jsonify(create_response(
+        return json_response(create_response(
             success=True,
             message="File uploaded successfully",
             data={
@@ -140,56 +133,73 @@ def upload_image():
             }
         )), 201
         
+    except RequestEntityTooLarge:
+        # Werkzeug rejects bodies over MAX_CONTENT_LENGTH while parsing the form
+        return _file_too_large()
+    
     except Exception as e:
         print(f"Error uploading file: {str(e)}")
         print(traceback.format_exc())
-        return jsonify(create_response(
+        return json_response(create_response(
             success=False,
             message="Error uploading file",
             error=str(e)
         )), 500
 
 
+def _preset_style_id(value):
+    """Return value if it names a style preset, otherwise None"""
+    if isinstance(value, str) and value in STYLE_PRESET_IDS:
+        return value
+    return None
+
+
+def _image_not_found(kind):
+    """404 response for a missing 'content' or 'style' image"""
+    return json_response(create_response(
+        success=False,
+        message=f"{kind.capitalize()} image not found",
+        error=f"{kind}_not_found"
+    )), 404
+
+
 @transfer_bp.route('/transfer', methods=['POST'])
 def perform_transfer():
     """Perform style transfer on an image"""
     try:
-        # Initialize models if needed
-        init_models()
-        
         data = request.get_json()
         
         # Validate required fields
-        if not data or 'content_image' not in data or 'style_image' not in data:
-            return jsonify(create_response(
+        if not data or 'content_image' not in data or \
+                ('style_image' not in data and 'style_id' not in data):
+            return json_response(create_response(
                 success=False,
-                message="Missing required fields: content_image and style_image",
+                message="Missing required fields: content_image and style_image or style_id",
                 error="missing_fields"
             )), 400
         
         content_path = Path(data['content_image'])
-        style_path = Path(data['style_image'])
-        
-        # Validate files exist
-        if not content_path.exists():
-            return jsonify(create_response(
-                success=False,
-                message="Content image not found",
-                error="content_not_found"
-            )), 404
-        
-        if not style_path.exists():
-            return jsonify(create_response(
-                success=False,
-                message="Style image not found",
-                error="style_not_found"
-            )), 404
+        style_path = Path(data['style_image']) if 'style_image' in data else None
         
         # Get parameters
         intensity = float(data.get('intensity', 1.0))
         quality = data.get('quality', 'standard')  # 'fast', 'standard', 'high'
         
-        # Determine number of steps based on quality
+        # Preset styles with a pretrained network use a single forward pass;
+        # 'high' quality and arbitrary style images use optimization
+        style_id = _preset_style_id(data.get('style_id'))
+        fast_model = current_app.extensions['style_model'].fast_model
+        if quality == 'high' or not (style_id and fast_model and fast_model.has_style(style_id)):
+            style_id = None
+        
+        if style_id is None and style_path is None:
+            return json_response(create_response(
+                success=False,
+                message="No pretrained model for this style. Please provide a style image",
+                error="style_image_required"
+            )), 400
+        
+        # Determine number of steps based on quality (optimization only)
         num_steps_map = {
             'fast': 100,
             'standard': 200,
@@ -203,46 +213,170 @@ def perform_transfer():
         
         print(f"🎨 Starting style transfer...")
         print(f"   Content: {content_path.name}")
-        print(f"   Style: {style_path.name}")
-        print(f"   Quality: {quality} ({num_steps} steps)")
+        if style_id:
+            print(f"   Style: {style_id} (feed-forward)")
+        else:
+            print(f"   Style: {style_path.name}")
+            print(f"   Quality: {quality} ({num_steps} steps)")
         print(f"   Intensity: {intensity}")
         
-        start_time = time.time()
+        transfer_args = {
+            'content_path': str(content_path),
+            'style_path': str(style_path) if style_path else None,
+            'output_path': str(output_path),
+            'num_steps': num_steps,
+            'intensity': intensity,
+            'style_id': style_id
+        }
         
-        # Perform style transfer
-        result_path = style_transfer_model.transfer_style(
-            content_path=str(content_path),
-            style_path=str(style_path),
-            output_path=str(output_path),
-            num_steps=num_steps,
-            style_weight=int(1000000 * intensity),
-            content_weight=1
-        )
+        # Hand off to the background worker unless the client opts out
+        if data.get('async', True) and current_app.extensions['transfer_queue'] is not None:
+            # The worker can't answer with a 404, so check inputs up front
+            if not content_path.is_file():
+                return _image_not_found('content')
+            if style_id is None and not style_path.is_file():
+                return _image_not_found('style')
+            
+            job = enqueue_transfer(**transfer_args)
+            
+            return json_response(create_response(
+                success=True,
+                message="Style transfer queued",
+                data={
+                    'job_id': job.id,
+                    'status': job.get_status()
+                }
+            )), 202
+        
+        # Perform style transfer; a missing input surfaces when the model
+        # opens it rather than through a separate, racy exists() check
+        try:
+            result = run_transfer(**transfer_args)
+        except FileNotFoundError as e:
+            if str(e.filename) == transfer_args['content_path']:
+                return _image_not_found('content')
+            if str(e.filename) == transfer_args['style_path']:
+                return _image_not_found('style')
+            raise
+        
+        return json_response(create_response(
+            success=True,
+            message="Style transfer completed successfully",
+            data=result
+        )), 200
         
-        processing_time = time.time() - start_time
+    except Exception as e:
+        print(f"Error in style transfer: {str(e)}")
+        print(traceback.format_exc())
+        return json_response(create_response(
+            success=False,
+            message="Error performing style transfer",
+            error=str(e)
+        )), 500
+
+
+def _job_error(job):
+    """Log a failed job's traceback and return a client-safe error code"""
+    print(f"Style transfer job {job.id} failed:\n{job.exc_info}")
+    return "transfer_failed"
+
+
+@transfer_bp.route('/transfer/status/<job_id>', methods=['GET'])
+def transfer_status(job_id):
+    """Get the status of a queued style transfer"""
+    try:
+        if current_app.extensions['transfer_queue'] is None:
+            return json_response(create_response(
+                success=False,
+                message="Job queue is not configured",
+                error="queue_unavailable"
+            )), 503
         
-        # Get result image info
-        result_info = ImageProcessor.get_image_info(output_path)
+        job = fetch_job(job_id)
         
-        print(f"✅ Style transfer completed in {processing_time:.1f}s")
+        if job is None:
+            return json_response(create_response(
+                success=False,
+                message="Job not found",
+                error="not_found"
+            )), 404
+        
+        status = job.get_status()
+        data = {'job_id': job.id, 'status': status}
+        if status == 'finished':
+            data['result'] = job.result
+        elif status == 'failed':
+            data['error'] = _job_error(job)
         
-        return jsonify(create_response(
+        return json_response(create_response(
+            success=True,
+            message="Job status retrieved",
+            data=data
+        )), 200
+        
+    except Exception as e:
+        print(f"Error getting job status: {str(e)}")
+        return json_response(create_response(
+            success=False,
+            message="Error getting job status",
+            error=str(e)
+        )), 500
+
+
+@transfer_bp.route('/transfer/result/<job_id>', methods=['GET'])
+def transfer_result(job_id):
+    """Get the result of a finished style transfer"""
+    try:
+        if current_app.extensions['transfer_queue'] is None:
+            return json_response(create_response(
+                success=False,
+                message="Job queue is not configured",
+                error="queue_unavailable"
+            )), 503
+        
+        job = fetch_job(job_id)
+        
+        if job is None:
+            return json_response(create_response(
+                success=False,
+                message="Job not found",
+                error="not_found"
+            )), 404
+        
+        status = job.get_status()
+        
+        if status == 'failed':
+            return json_response(create_response(
+                success=False,
+                message="Style transfer failed",
+                error=_job_error(job)
+            )), 500
+        
+        if status in ('stopped', 'canceled'):
+            return json_response(create_response(
+                success=False,
+                message=f"Style transfer was {status}",
+                error=f"job_{status}"
+            )), 410
+        
+        if status != 'finished':
+            return json_response(create_response(
+                success=True,
+                message="Style transfer still in progress",
+                data={'job_id': job.id, 'status': status}
+            )), 202
+        
+        return json_response(create_response(
             success=True,
             message="Style transfer completed successfully",
-            data={
-                'output_image': output_filename,
-                'output_path': str(output_path),
-                'processing_time': f"{processing_time:.1f}s",
-                'info': result_info
-            }
+            data=job.result
         )), 200
         
     except Exception as e:
-        print(f"Error in style transfer: {str(e)}")
-        print(traceback.format_exc())
-        return jsonify(create_response(
+        print(f"Error getting job result: {str(e)}")
+        return json_response(create_response(
             success=False,
-            message="Error performing style transfer",
+            message="Error getting job result",
             error=str(e)
         )), 500
 
@@ -251,12 +385,10 @@ def perform_transfer():
 def quick_transfer():
     """Perform quick style transfer (fewer iterations)"""
     try:
-        init_models()
-        
         data = request.get_json()
         
         if not data or 'content_image' not in data or 'style_image' not in data:
-            return jsonify(create_response(
+            return json_response(create_response(
                 success=False,
                 message="Missing required fields",
                 error="missing_fields"
@@ -265,6 +397,7 @@ def quick_transfer():
         content_path = Path(data['content_image'])
         style_path = Path(data['style_image'])
         intensity = float(data.get('intensity', 1.0))
+        style_id = _preset_style_id(data.get('style_id'))
         
         output_filename = generate_filename(prefix='quick_styled', extension='png')
         output_path = current_app.config['UPLOAD_FOLDER'] / output_filename
@@ -272,16 +405,18 @@ def quick_transfer():
         print(f"⚡ Starting quick style transfer...")
         start_time = time.time()
         
-        result_path = style_transfer_model.quick_transfer(
-            content_path=str(content_path),
-            style_path=str(style_path),
-            output_path=str(output_path),
-            intensity=intensity
-        )
+        with current_app.extensions['model_lock']:
+            result_path = current_app.extensions['style_model'].quick_transfer(
+                content_path=str(content_path),
+                style_path=str(style_path),
+                output_path=str(output_path),
+                intensity=intensity,
+                style_id=style_id
+            )
         
         processing_time = time.time() - start_time
         
-        return jsonify(create_response(
+        return json_response(create_response(
             success=True,
             message="Quick style transfer completed",
             data={
@@ -293,7 +428,7 @@ def quick_transfer():
         
     except Exception as e:
         print(f"Error in quick transfer: {str(e)}")
-        return jsonify(create_response(
+        return json_response(create_response(
             success=False,
             message="Error performing quick transfer",
             error=str(e)
@@ -304,20 +439,35 @@ def quick_transfer():
 def get_image(filename):
     """Serve an image file"""
     try:
-        filepath = current_app.config['UPLOAD_FOLDER'] / filename
+        upload_folder = current_app.config['UPLOAD_FOLDER']
+        filepath = upload_folder / filename
         
-        if not filepath.exists():
-            return jsonify(create_response(
+        if not filepath.is_file():
+            return json_response(create_response(
                 success=False,
                 message="Image not found",
                 error="not_found"
             )), 404
         
-        return send_file(filepath, mimetype='image/png')
+        # Let nginx send the file itself when deployed behind it
+        accel_prefix = current_app.config['X_ACCEL_REDIRECT_PREFIX']
+        if accel_prefix:
+            mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+            response = current_app.response_class(mimetype=mimetype)
+            response.headers['X-Accel-Redirect'] = f"{accel_prefix.rstrip('/')}/{filename}"
+        else:
+            response = send_from_directory(upload_folder, filename, conditional=True,
+                                           etag=True, max_age=86400)
+        
+        # Generated filenames are unique, so their content never changes
+        response.cache_control.public = True
+        response.cache_control.max_age = 86400
+        response.cache_control.immutable = True
+        return response
         
     except Exception as e:
         print(f"Error serving image: {str(e)}")
-        return jsonify(create_response(
+        return json_response(create_response(
             success=False,
             message="Error serving image",
             error=str(e)
@@ -328,12 +478,10 @@ def get_image(filename):
 def generate_variations():
     """Generate variations of an image"""
     try:
-        init_models()
-        
         data = request.get_json()
         
         if not data or 'image' not in data:
-            return jsonify(create_response(
+            return json_response(create_response(
                 success=False,
                 message="Missing image field",
                 error="missing_field"
@@ -342,17 +490,24 @@ def generate_variations():
         image_path = Path(data['image'])
         num_variations = int(data.get('num_variations', 4))
         
-        variations = gan_inference.generate_variations(str(image_path), num_variations)
+        variations = current_app.extensions['gan_inference'].generate_variations(
+            str(image_path), num_variations
+        )
+        
+        # Save variations in parallel (PNG encoding releases the GIL)
+        variation_files = [
+            generate_filename(prefix=f'variation_{i}', extension='png')
+            for i in range(len(variations))
+        ]
+        upload_folder = current_app.config['UPLOAD_FOLDER']
         
-        # Save variations
-        variation_files = []
-        for i, var_img in enumerate(variations):
-            filename = generate_filename(prefix=f'variation_{i}', extension='png')
-            filepath = current_app.config['UPLOAD_FOLDER'] / filename
-            var_img.save(filepath)
-            variation_files.append(filename)
+        with ThreadPoolExecutor(max_workers=max(len(variations), 1)) as executor:
+            list(executor.map(
+                lambda item: item[0].save(upload_folder / item[1]),
+                zip(variations, variation_files)
+            ))
         
-        return jsonify(create_response(
+        return json_response(create_response(
             success=True,
             message="Variations generated successfully",
             data={
@@ -362,7 +517,7 @@ def generate_variations():
         
     except Exception as e:
         print(f"Error generating variations: {str(e)}")
-        return jsonify(create_response(
+        return json_response(create_response(
             success=False,
             message="Error generating variations",
             error=str(e)
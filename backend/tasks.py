@@ -0,0 +1,112 @@
+"""
+Background jobs for AI Design Studio
+Style transfer runs on a dedicated worker process through an RQ queue
+"""
+
+import time
+from pathlib import Path
+from flask import current_app
+
+from utils.image_processing import ImageProcessor
+
+
+def init_queue(app):
+    """Connect the style transfer job queue (only when REDIS_URL is set)"""
+    app.extensions['transfer_queue'] = None
+    
+    if not app.config['REDIS_URL']:
+        return
+    
+    from redis import Redis
+    from rq import Queue
+    
+    app.extensions['transfer_queue'] = Queue(
+        app.config['TRANSFER_QUEUE_NAME'],
+        connection=Redis.from_url(app.config['REDIS_URL'])
+    )
+
+
+def enqueue_transfer(**kwargs):
+    """Queue a style transfer job"""
+    return current_app.extensions['transfer_queue'].enqueue(
+        run_transfer,
+        kwargs=kwargs,
+        job_timeout=current_app.config['TRANSFER_JOB_TIMEOUT'],
+        result_ttl=current_app.config['TRANSFER_RESULT_TTL']
+    )
+
+
+def fetch_job(job_id):
+    """Look up a queued job, or None if it does not exist"""
+    from rq.exceptions import NoSuchJobError
+    from rq.job import Job
+    
+    queue = current_app.extensions['transfer_queue']
+    try:
+        return Job.fetch(job_id, connection=queue.connection)
+    except NoSuchJobError:
+        return None
+
+
+def run_transfer(content_path, style_path, output_path, num_steps, intensity,
+                 style_id=None):
+    """
+    Run a style transfer and describe its output
+    
+    Runs inside the web process for synchronous requests and inside
+    worker.py for queued ones; both have an app context with the models.
+    
+    Args:
+        style_id: Preset style with a pretrained feed-forward network. When
+            it loads, style_path and num_steps are ignored; otherwise the
+            transfer falls back to optimization with style_path.
+    
+    Returns:
+        Dictionary with output filename, path, processing time and info
+    """
+    start_time = time.time()
+    style_model = current_app.extensions['style_model']
+    
+    with current_app.extensions['model_lock']:
+        if style_id:
+            try:
+                # Fetch/load the pretrained network first, so a download
+                # failure can fall back to optimizing against the style image
+                style_model.fast_model.get_net(style_id)
+            except Exception as e:
+                if style_path is None:
+                    raise
+                print(f"⚠️  Feed-forward model for {style_id} unavailable, using optimization: {e}")
+                style_id = None
+        
+        if style_id:
+            style_model.feed_forward(
+                content_path=str(content_path),
+                style_id=style_id,
+                output_path=str(output_path),
+                intensity=intensity
+            )
+        else:
+            style_model.transfer_style(
+                content_path=str(content_path),
+                style_path=str(style_path),
+                output_path=str(output_path),
+                num_steps=num_steps,
+                style_weight=int(1000000 * intensity),
+                content_weight=1
+            )
+    
+    processing_time = time.time() - start_time
+    output_path = Path(output_path)
+    
+    # Gallery listings show this instead of the full-size image
+    ImageProcessor.save_thumbnail(output_path)
+    
+    print(f"✅ Style transfer completed in {processing_time:.1f}s")
+    
+    return {
+        'output_image': output_path.name,
+        'output_path': str(output_path),
+        'processing_time': f"{processing_time:.1f}s",
+        'info': ImageProcessor.get_image_info(output_path)
+    }
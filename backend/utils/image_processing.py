@@ -2,7 +2,56 @@ import cv2
 import numpy as np
 from PIL import Image
 import io
-import base64
+from pathlib import Path
+
+try:
+    # SIMD base64 codec, API-compatible with the stdlib module
+    import pybase64 as base64
+except ImportError:
+    import base64
+
+def _fast_resize(img_array, new_size):
+    """
+    Resize an image array with OpenCV's SIMD resamplers
+    
+    INTER_AREA for downscaling (no aliasing), INTER_LANCZOS4 for upscaling.
+    new_size is (width, height), like PIL.
+    """
+    height, width = img_array.shape[:2]
+    if new_size[0] <= width and new_size[1] <= height:
+        interpolation = cv2.INTER_AREA
+    else:
+        interpolation = cv2.INTER_LANCZOS4
+    
+    return cv2.resize(img_array, new_size, interpolation=interpolation)
+
+
+def _load_uint8_array(image_path):
+    """
+    Open an image as a uint8 array suitable for cv2.LUT
+    
+    Modes without 8-bit channels (palette, 16-bit, float, CMYK) are expanded
+    to RGB/RGBA first.
+    """
+    img = Image.open(image_path)
+    if img.mode not in ('L', 'LA', 'RGB', 'RGBA'):
+        has_alpha = img.mode == 'PA' or 'transparency' in img.info
+        img = img.convert('RGBA' if has_alpha else 'RGB')
+    
+    return np.asarray(img)
+
+
+# Per-pixel RGB color transforms for apply_filter (output = kernel @ rgb)
+FILTER_KERNELS = {
+    'sepia': np.array([
+        [0.393, 0.769, 0.189],
+        [0.349, 0.686, 0.168],
+        [0.272, 0.534, 0.131]
+    ], dtype=np.float32),
+    'warm': np.diag([1.1, 1.0, 0.9]).astype(np.float32),  # More red, less blue
+    'cool': np.diag([0.9, 1.0, 1.1]).astype(np.float32),  # Less red, more blue
+}
+
 
 class ImageProcessor:
     """Utilities for image processing operations"""
@@ -22,6 +71,11 @@ class ImageProcessor:
         """
         img = Image.open(image_path)
         
+        # Palette/bilevel/CMYK pixels can't be interpolated as-is; expand them
+        if img.mode not in ('L', 'LA', 'RGB', 'RGBA'):
+            has_alpha = img.mode == 'PA' or 'transparency' in img.info
+            img = img.convert('RGBA' if has_alpha else 'RGB')
+        
         if maintain_aspect:
             # Calculate new size maintaining aspect ratio
             ratio = min(max_size / img.size[0], max_size / img.size[1])
@@ -29,19 +83,30 @@ class ImageProcessor:
         else:
             new_size = (max_size, max_size)
         
-        img = img.resize(new_size, Image.Resampling.LANCZOS)
-        return img
+        img_array = _fast_resize(np.asarray(img), new_size)
+        return Image.fromarray(img_array)
     
     @staticmethod
     def image_to_base64(image_path):
         """Convert image file to base64 string"""
-        with open(image_path, "rb") as img_file:
-            return base64.b64encode(img_file.read()).decode('utf-8')
+        return base64.b64encode(Path(image_path).read_bytes()).decode('ascii')
     
     @staticmethod
-    def base64_to_image(base64_string, output_path):
-        """Convert base64 string to image file"""
+    def base64_to_image(base64_string, output_path, raw=False):
+        """
+        Convert base64 string to image file
+        
+        Args:
+            base64_string: Base64-encoded image data
+            output_path: Where to write the image
+            raw: Write the decoded bytes as-is instead of re-encoding through
+                PIL (use when the data is already in the target format)
+        """
         img_data = base64.b64decode(base64_string)
+        if raw:
+            Path(output_path).write_bytes(img_data)
+            return output_path
+        
         img = Image.open(io.BytesIO(img_data))
         img.save(output_path)
         return output_path
@@ -53,17 +118,41 @@ class ImageProcessor:
         img.thumbnail(size, Image.Resampling.LANCZOS)
         return img
     
+    @staticmethod
+    def thumbnail_path(image_path):
+        """Get the gallery thumbnail path for an image"""
+        image_path = Path(image_path)
+        return image_path.with_name(f"thumb_{image_path.stem}.webp")
+    
+    @staticmethod
+    def save_thumbnail(image_path, size=(128, 128)):
+        """
+        Save a small WebP thumbnail next to an image
+        
+        Lets gallery listings show previews without downloading the
+        full-size output.
+        
+        Returns:
+            Path to the thumbnail
+        """
+        thumb_path = ImageProcessor.thumbnail_path(image_path)
+        img = ImageProcessor.create_thumbnail(image_path, size)
+        img.save(thumb_path, 'WEBP', quality=80)
+        return thumb_path
+    
     @staticmethod
     def get_image_info(image_path):
-        """Get basic information about an image"""
-        img = Image.open(image_path)
-        return {
-            'width': img.size[0],
-            'height': img.size[1],
-            'format': img.format,
-            'mode': img.mode,
-            'size_bytes': image_path.stat().st_size if hasattr(image_path, 'stat') else None
-        }
+        """Get basic information about an image (reads the header only)"""
+        # Image.open parses just the header; pixels are never decoded here,
+        # and the context manager closes the file handle right away
+        with Image.open(image_path) as img:
+            return {
+                'width': img.width,
+                'height': img.height,
+                'format': img.format,
+                'mode': img.mode,
+                'size_bytes': image_path.stat().st_size if hasattr(image_path, 'stat') else None
+            }
     
     @staticmethod
     def adjust_brightness(image_path, factor=1.2):
@@ -74,10 +163,10 @@ class ImageProcessor:
             image_path: Path to image
             factor: Brightness factor (1.0 = original, >1.0 = brighter, <1.0 = darker)
         """
-        img = Image.open(image_path)
-        img_array = np.array(img).astype(np.float32)
-        img_array = np.clip(img_array * factor, 0, 255).astype(np.uint8)
-        return Image.fromarray(img_array)
+        img_array = _load_uint8_array(image_path)
+        # Pointwise over a uint8 domain: one 256-entry table, one cv2.LUT pass
+        lut = np.clip(np.arange(256, dtype=np.float32) * factor, 0, 255).astype(np.uint8)
+        return Image.fromarray(cv2.LUT(img_array, lut))
     
     @staticmethod
     def adjust_contrast(image_path, factor=1.2):
@@ -87,12 +176,13 @@ class ImageProcessor:
         Args:
             factor: Contrast factor (1.0 = original)
         """
-        img = Image.open(image_path)
-        img_array = np.array(img).astype(np.float32)
-        mean = img_array.mean()
-        img_array = mean + factor * (img_array - mean)
-        img_array = np.clip(img_array, 0, 255).astype(np.uint8)
-        return Image.fromarray(img_array)
+        img_array = _load_uint8_array(image_path)
+        channels = 1 if img_array.ndim == 2 else img_array.shape[2]
+        # cv2.mean gives per-channel means; equal pixel counts, so average them
+        mean = float(np.mean(cv2.mean(img_array)[:channels]))
+        lut = mean + factor * (np.arange(256, dtype=np.float32) - mean)
+        lut = np.clip(lut, 0, 255).astype(np.uint8)
+        return Image.fromarray(cv2.LUT(img_array, lut))
     
     @staticmethod
     def extract_colors(image_path, num_colors=5):
@@ -108,14 +198,14 @@ class ImageProcessor:
         """
         img = Image.open(image_path)
         img = img.convert('RGB')
-        img = img.resize((150, 150))  # Reduce size for faster processing
-        
-        img_array = np.array(img).reshape(-1, 3)
+        img = img.resize((64, 64))  # Reduce size for faster processing
         
-        # Use k-means clustering to find dominant colors
-        from scipy.cluster.vq import kmeans, vq
+        img_array = np.asarray(img, dtype=np.float32).reshape(-1, 3)
         
-        colors, _ = kmeans(img_array.astype(float), num_colors)
+        # Use k-means clustering (OpenCV) to find dominant colors
+        criteria = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_MAX_ITER, 10, 1.0)
+        _, _, colors = cv2.kmeans(img_array, num_colors, None, criteria, 3,
+                                  cv2.KMEANS_PP_CENTERS)
         colors = colors.astype(int)
         
         return [tuple(color) for color in colors]
@@ -149,31 +239,19 @@ class ImageProcessor:
             filter_type: 'sepia', 'grayscale', 'warm', 'cool'
         """
         img = Image.open(image_path).convert('RGB')
-        img_array = np.array(img).astype(np.float32)
-        
-        if filter_type == 'sepia':
-            sepia_filter = np.array([
-                [0.393, 0.769, 0.189],
-                [0.349, 0.686, 0.168],
-                [0.272, 0.534, 0.131]
-            ])
-            img_array = img_array @ sepia_filter.T
-        
-        elif filter_type == 'grayscale':
-            gray = 0.2989 * img_array[:, :, 0] + \
-                   0.5870 * img_array[:, :, 1] + \
-                   0.1140 * img_array[:, :, 2]
-            img_array = np.stack([gray, gray, gray], axis=-1)
-        
-        elif filter_type == 'warm':
-            img_array[:, :, 0] *= 1.1  # Increase red
-            img_array[:, :, 2] *= 0.9  # Decrease blue
-        
-        elif filter_type == 'cool':
-            img_array[:, :, 0] *= 0.9  # Decrease red
-            img_array[:, :, 2] *= 1.1  # Increase blue
-        
-        img_array = np.clip(img_array, 0, 255).astype(np.uint8)
+        
+        if filter_type == 'grayscale':
+            # Same BT.601 luma weights, fixed-point; GRAY2RGB just broadcasts
+            gray = cv2.cvtColor(np.asarray(img), cv2.COLOR_RGB2GRAY)
+            return Image.fromarray(cv2.cvtColor(gray, cv2.COLOR_GRAY2RGB))
+        
+        kernel = FILTER_KERNELS.get(filter_type)
+        
+        if kernel is None:
+            return img
+        
+        # Single uint8 pass; cv2.transform saturates to [0, 255]
+        img_array = cv2.transform(np.asarray(img), kernel)
         return Image.fromarray(img_array)
     
     @staticmethod
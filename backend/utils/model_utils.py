@@ -1,9 +1,17 @@
 import os
+import json
 import time
+import secrets
+import threading
 from pathlib import Path
+from flask import current_app, g, has_request_context
 from werkzeug.utils import secure_filename
-import hashlib
-from datetime import datetime, timedelta
+from datetime import datetime
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 def allowed_file(filename, allowed_extensions):
     """
@@ -31,8 +39,8 @@ def generate_filename(prefix='image', extension='png'):
     Returns:
         Unique filename string
     """
-    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    random_str = hashlib.md5(str(time.time()).encode()).hexdigest()[:8]
+    timestamp = time.strftime('%Y%m%d_%H%M%S')
+    random_str = secrets.token_hex(4)
     return f"{prefix}_{timestamp}_{random_str}.{extension}"
 
 
@@ -51,23 +59,52 @@ def cleanup_old_files(directory, max_age_hours=24):
     if not directory.exists():
         return 0
     
-    cutoff_time = datetime.now() - timedelta(hours=max_age_hours)
+    cutoff_time = time.time() - max_age_hours * 3600
     deleted_count = 0
     
-    for file_path in directory.iterdir():
-        if file_path.is_file() and file_path.name != '.gitkeep':
-            file_time = datetime.fromtimestamp(file_path.stat().st_mtime)
+    # scandir entries carry their stat info, avoiding a stat() per file
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.name == '.gitkeep' or not entry.is_file(follow_symlinks=False):
+                continue
             
-            if file_time < cutoff_time:
+            if entry.stat().st_mtime < cutoff_time:
                 try:
-                    file_path.unlink()
+                    os.unlink(entry.path)
                     deleted_count += 1
-                except Exception as e:
-                    print(f"Error deleting {file_path}: {e}")
+                except OSError as e:
+                    print(f"Error deleting {entry.path}: {e}")
     
     return deleted_count
 
 
+def start_cleanup_thread(directory, max_age_hours=24, interval_seconds=3600):
+    """
+    Periodically clean up old files on a background daemon thread
+    
+    Args:
+        directory: Path to directory
+        max_age_hours: Maximum age of files in hours
+        interval_seconds: Time between sweeps
+    
+    Returns:
+        The started thread
+    """
+    def cleanup_loop():
+        while True:
+            time.sleep(interval_seconds)
+            try:
+                deleted_count = cleanup_old_files(directory, max_age_hours=max_age_hours)
+                if deleted_count:
+                    print(f"🧹 Cleaned up {deleted_count} old files")
+            except Exception as e:
+                print(f"Error during scheduled cleanup: {e}")
+    
+    thread = threading.Thread(target=cleanup_loop, name='upload-cleanup', daemon=True)
+    thread.start()
+    return thread
+
+
 def get_file_size_mb(file_path):
     """Get file size in megabytes"""
     return Path(file_path).stat().st_size / (1024 * 1024)
@@ -88,6 +125,17 @@ def validate_image_size(file_path, max_size_mb=16):
     return size_mb <= max_size_mb, size_mb
 
 
+def _response_timestamp():
+    """Timestamp for API responses, computed once per request"""
+    if not has_request_context():
+        return datetime.now().isoformat()
+    
+    timestamp = g.get('_response_timestamp')
+    if timestamp is None:
+        timestamp = g._response_timestamp = datetime.now().isoformat()
+    return timestamp
+
+
 def create_response(success, message, data=None, error=None):
     """
     Create standardized API response
@@ -104,7 +152,7 @@ def create_response(success, message, data=None, error=None):
     response = {
         'success': success,
         'message': message,
-        'timestamp': datetime.now().isoformat()
+        'timestamp': _response_timestamp()
     }
     
     if data is not None:
@@ -164,4 +212,34 @@ def format_time(seconds):
         return f"{minutes:.1f}m"
     else:
         hours = seconds / 3600
-        return f"{hours:.1f}h"
\ No newline at end of file
+        return f"{hours:.1f}h"
+
+
+def dumps_json(payload):
+    """
+    Serialize a payload to JSON, using orjson when it is installed
+    
+    Returns:
+        bytes (orjson) or str (stdlib json)
+    """
+    if orjson is not None:
+        return orjson.dumps(payload, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(payload)
+
+
+def json_response(payload, status=200):
+    """
+    Build a JSON response without going through jsonify
+    
+    Args:
+        payload: JSON-serializable data (usually from create_response)
+        status: HTTP status code
+    
+    Returns:
+        Flask Response object
+    """
+    return current_app.response_class(
+        dumps_json(payload),
+        status=status,
+        mimetype='application/json'
+    )
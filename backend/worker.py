@@ -0,0 +1,33 @@
+"""
+Style transfer worker process
+
+Runs queued jobs in-process (SimpleWorker) so the models stay loaded
+and the GPU is never used from a forked child:
+
+    REDIS_URL=redis://localhost:6379/0 python worker.py
+"""
+
+import os
+from dotenv import load_dotenv
+
+from app import create_app
+
+load_dotenv()
+
+
+def main():
+    app = create_app(os.getenv('FLASK_ENV', 'production'))
+    queue = app.extensions['transfer_queue']
+    
+    if queue is None:
+        raise SystemExit("REDIS_URL must be set to run the worker")
+    
+    from rq import SimpleWorker
+    
+    with app.app_context():
+        print(f"👷 Worker listening on queue '{queue.name}'")
+        SimpleWorker([queue], connection=queue.connection).work()
+
+
+if __name__ == '__main__':
+    main()
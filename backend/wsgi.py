@@ -0,0 +1,11 @@
+"""
+WSGI entrypoint for production servers
+
+    gunicorn -c gunicorn_conf.py wsgi:app
+"""
+
+import os
+
+from app import create_app
+
+app = create_app(os.getenv('FLASK_ENV', 'production'))
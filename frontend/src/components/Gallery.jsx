@@ -83,7 +83,7 @@ const Gallery = ({ onClose }) => {
                   onClick={() => setSelectedImage(image)}
                 >
                   <img
-                    src={api.getImageUrl(image.filename)}
+                    src={api.getImageUrl(image.thumbnail || image.filename)}
                     alt={image.filename}
                     className="gallery-thumbnail"
                   />
@@ -74,10 +74,43 @@ const api = {
    * @param {number} data.intensity - Style intensity (0.1 - 2.0)
    * @param {string} data.quality - Quality setting ('fast', 'standard', 'high')
    */
-  styleTransfer: (data) => {
-    return apiClient.post('/api/transfer', data, {
+  styleTransfer: async (data) => {
+    const response = await apiClient.post('/api/transfer', data, {
       timeout: 600000, // 10 minutes for high quality
     });
+
+    // Queued on the background worker: poll until the result is ready
+    if (response.status === 202) {
+      return api.waitForTransfer(response.data.data.job_id);
+    }
+
+    return response;
+  },
+
+  /**
+   * Get the status of a queued style transfer
+   * @param {string} jobId - Job id returned by styleTransfer
+   */
+  getTransferStatus: (jobId) => {
+    return apiClient.get(`/api/transfer/status/${jobId}`);
+  },
+
+  /**
+   * Poll a queued style transfer until it finishes
+   * @param {string} jobId - Job id returned by styleTransfer
+   * @param {number} interval - Polling interval in milliseconds
+   * @param {number} maxWait - Give up after this many milliseconds
+   */
+  waitForTransfer: async (jobId, interval = 2000, maxWait = 900000) => {
+    const deadline = Date.now() + maxWait;
+    while (Date.now() < deadline) {
+      const response = await apiClient.get(`/api/transfer/result/${jobId}`);
+      if (response.status !== 202) {
+        return response;
+      }
+      await new Promise((resolve) => setTimeout(resolve, interval));
+    }
+    throw new Error('Timed out waiting for the style transfer to finish');
   },
 
   /**